@@ -36,6 +36,13 @@ GENERATE_TYPE = ['jobs', 'views']
 
 def get_openshift_saas_deploy_job_name(saas_file_name, env_name, settings):
     job_template_name = settings['saasDeployJobTemplate']
+    return get_openshift_saas_deploy_job_name_from_template(
+        saas_file_name, env_name, job_template_name)
+
+
+def get_openshift_saas_deploy_job_name_from_template(saas_file_name,
+                                                     env_name,
+                                                     job_template_name):
     return f"{job_template_name}-{saas_file_name}-{env_name}"
 
 
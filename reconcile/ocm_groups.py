@@ -1,5 +1,4 @@
 import logging
-import itertools
 
 import reconcile.utils.threaded as threaded
 import reconcile.queries as queries
@@ -8,40 +7,62 @@ import reconcile.openshift_groups as openshift_groups
 from reconcile.utils.ocm import OCMMap
 
 QONTRACT_INTEGRATION = 'ocm-groups'
+MANAGED_GROUP = 'dedicated-admins'
 
 
-def get_cluster_state(group_items, ocm_map):
+def get_cluster_state(cluster_items):
     results = []
-    cluster = group_items["cluster"]
-    ocm = ocm_map.get(cluster)
-    group_name = group_items["group_name"]
-    group = ocm.get_group_if_exists(cluster, group_name)
-    if group is None:
-        return results
-    for user in group['users'] or []:
-        results.append({
-            "cluster": cluster,
-            "group": group_name,
-            "user": user
-        })
+    cluster = cluster_items["cluster"]
+    ocm = cluster_items["ocm"]
+    groups = ocm.get_groups(cluster, group_ids=[MANAGED_GROUP])
+    for user in groups.get(MANAGED_GROUP) or []:
+        results.append((cluster, MANAGED_GROUP, user))
     return results
 
 
 def fetch_current_state(thread_pool_size):
     clusters = queries.get_clusters()
     clusters = [c for c in clusters if c.get('ocm') is not None]
-    current_state = []
+    current_state = set()
     settings = queries.get_app_interface_settings()
     ocm_map = OCMMap(clusters=clusters, integration=QONTRACT_INTEGRATION,
-                     settings=settings)
-    groups_list = openshift_groups.create_groups_list(clusters, oc_map=ocm_map)
-    results = threaded.run(get_cluster_state, groups_list, thread_pool_size,
-                           ocm_map=ocm_map)
-
-    current_state = list(itertools.chain.from_iterable(results))
+                     settings=settings, thread_pool_size=thread_pool_size)
+    # we only manage dedicated-admins via OCM
+    ocm_by_cluster = {c['name']: ocm_map.get(c['name']) for c in clusters
+                      if MANAGED_GROUP in (c['managedGroups'] or [])}
+    cluster_items = [{"cluster": cluster, "ocm": ocm}
+                     for cluster, ocm in ocm_by_cluster.items() if ocm]
+    results = threaded.run(get_cluster_state, cluster_items,
+                           thread_pool_size)
+
+    for r in results:
+        current_state.update(r)
     return ocm_map, current_state
 
 
+def fetch_desired_state(ocm_map):
+    desired_state = openshift_groups.fetch_desired_state(oc_map=ocm_map)
+    # we only manage dedicated-admins via OCM
+    return {(s['cluster'], s['group'], s['user']) for s in desired_state
+            if s['group'] == MANAGED_GROUP}
+
+
+def calculate_diff(current_state, desired_state):
+    diffs = []
+    for action, state in [
+        ("add_user_to_group", desired_state - current_state),
+        ("del_user_from_group", current_state - desired_state),
+    ]:
+        for cluster, group, user in sorted(state):
+            diffs.append({
+                "action": action,
+                "cluster": cluster,
+                "group": group,
+                "user": user
+            })
+    return diffs
+
+
 def act(diff, ocm_map):
     cluster = diff['cluster']
     group = diff['group']
@@ -57,21 +78,13 @@ def act(diff, ocm_map):
 
 def run(dry_run, thread_pool_size=10):
     ocm_map, current_state = fetch_current_state(thread_pool_size)
-    desired_state = openshift_groups.fetch_desired_state(oc_map=ocm_map)
-
-    # we only manage dedicated-admins via OCM
-    current_state = [s for s in current_state
-                     if s['group'] == 'dedicated-admins']
-    desired_state = [s for s in desired_state
-                     if s['group'] == 'dedicated-admins']
+    desired_state = fetch_desired_state(ocm_map)
 
-    diffs = openshift_groups.calculate_diff(current_state, desired_state)
+    # we do not need to create/delete groups in OCM
+    diffs = calculate_diff(current_state, desired_state)
     openshift_groups.validate_diffs(diffs)
 
     for diff in diffs:
-        # we do not need to create/delete groups in OCM
-        if diff['action'] in ['create_group', 'delete_group']:
-            continue
         logging.info(list(diff.values()))
 
         if not dry_run:
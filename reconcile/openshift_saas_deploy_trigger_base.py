@@ -1,7 +1,7 @@
 import logging
-import datetime
-
-from threading import Lock
+import functools
+import itertools
+import time
 
 import reconcile.openshift_base as osb
 import reconcile.queries as queries
@@ -9,7 +9,8 @@ import reconcile.jenkins_plugins as jenkins_base
 import reconcile.utils.threaded as threaded
 
 from reconcile.utils.openshift_resource import OpenshiftResource as OR
-from reconcile.jenkins_job_builder import get_openshift_saas_deploy_job_name
+from reconcile.jenkins_job_builder import \
+    get_openshift_saas_deploy_job_name_from_template
 from reconcile.utils.oc import OC_Map
 from reconcile.utils.gitlab_api import GitLabApi
 from reconcile.utils.saasherder import SaasHerder, Providers, \
@@ -17,8 +18,6 @@ from reconcile.utils.saasherder import SaasHerder, Providers, \
 from reconcile.utils.sharding import is_in_shard
 from reconcile.utils.defer import defer
 
-_trigger_lock = Lock()
-
 
 @defer
 def run(dry_run,
@@ -62,28 +61,49 @@ def run(dry_run,
         return error
     defer(lambda: oc_map.cleanup())
 
+    # the only setting needed to trigger, resolved once for all specs
+    saas_deploy_job_template = settings['saasDeployJobTemplate']
     trigger_specs, diff_err = saasherder.get_diff(trigger_type, dry_run)
-    # This will be populated by 'trigger' in the below loop and
-    # we need it to be consistent across all iterations
-    already_triggered = set()
-
-    errors = \
+    # specs that would trigger the same deployment are only
+    # triggered once, the rest only get their state updated
+    trigger_specs, duplicate_specs = \
+        _split_duplicate_specs(trigger_specs, saas_deploy_job_template)
+    # specs are sharded by pipelines provider instance, so that
+    # triggers for one instance do not wait on another instance
+    shards = _shard_trigger_specs(trigger_specs)
+    results = \
         threaded.run(
-            trigger,
-            trigger_specs,
+            _trigger_shard,
+            shards,
             thread_pool_size,
+            total_thread_pool_size=thread_pool_size,
+            total_specs_count=len(trigger_specs),
             dry_run=dry_run,
             saasherder=saasherder,
             jenkins_map=jenkins_map,
             oc_map=oc_map,
-            already_triggered=already_triggered,
-            settings=settings,
+            saas_deploy_job_template=saas_deploy_job_template,
             trigger_type=trigger_type,
             integration=integration,
             integration_version=integration_version
         )
+    trigger_results = list(itertools.chain.from_iterable(results))
+    errors = [error for _, error in trigger_results]
     errors.append(diff_err)
 
+    if not dry_run:
+        # duplicates share the outcome of the spec that was triggered
+        failed_names = {_get_trigger_name(spec, saas_deploy_job_template)
+                        for spec, error in trigger_results
+                        if error}
+        update_specs = [
+            spec for spec in duplicate_specs
+            if _get_trigger_name(spec, saas_deploy_job_template)
+            not in failed_names
+        ]
+        threaded.run(_update_state, update_specs, thread_pool_size,
+                     saasherder=saasherder, trigger_type=trigger_type)
+
     return any(errors)
 
 
@@ -113,27 +133,25 @@ def setup(thread_pool_size,
         error (bool): True if one happened, False otherwise
     """
 
-    saas_files = queries.get_saas_files(v1=v1, v2=v2)
+    # fetch everything required for the setup in a single query
+    bundle = queries.get_trigger_setup_bundle(v1=v1, v2=v2)
+    saas_files = bundle.saas_files
     if not saas_files:
         logging.error('no saas files found')
         return None, None, None, None, True
     saas_files = [sf for sf in saas_files if is_in_shard(sf['name'])]
 
     # Remove saas-file targets that are disabled
-    for saas_file in saas_files[:]:
-        resource_templates = saas_file['resourceTemplates']
-        for rt in resource_templates[:]:
-            targets = rt['targets']
-            for target in targets[:]:
-                if target['disable']:
-                    targets.remove(target)
-
-    instance = queries.get_gitlab_instance()
-    settings = queries.get_app_interface_settings()
-    accounts = queries.get_aws_accounts()
+    for saas_file in saas_files:
+        for rt in saas_file['resourceTemplates']:
+            rt['targets'] = [t for t in rt['targets'] if not t['disable']]
+
+    instance = bundle.gitlab_instance
+    settings = bundle.settings
+    accounts = bundle.aws_accounts
     gl = GitLabApi(instance, settings=settings)
     jenkins_map = jenkins_base.get_jenkins_map()
-    pipelines_providers = queries.get_pipelines_providers()
+    pipelines_providers = bundle.pipelines_providers
     tkn_provider_namespaces = [pp['namespace'] for pp in pipelines_providers
                                if pp['provider'] == 'tekton']
 
@@ -157,13 +175,60 @@ def setup(thread_pool_size,
     return saasherder, jenkins_map, oc_map, settings, False
 
 
+def _trigger_shard(trigger_specs,
+                   total_thread_pool_size,
+                   total_specs_count,
+                   **kwargs):
+    """Trigger deployments for a shard of trigger specs
+
+    Args:
+        trigger_specs (list): Trigger specs of a single shard
+        total_thread_pool_size (int): Thread pool size to use for all shards
+        total_specs_count (int): Number of trigger specs in all shards
+        kwargs: Arguments to pass to 'trigger'
+
+    Returns:
+        list: (spec, error) tuples for each trigger spec
+    """
+    shard_thread_pool_size = _get_shard_thread_pool_size(
+        len(trigger_specs), total_specs_count, total_thread_pool_size)
+    # This will be populated by 'trigger' in the below loop and
+    # we need it to be consistent across all iterations of the shard
+    already_triggered = {}
+    errors = threaded.run(trigger, trigger_specs, shard_thread_pool_size,
+                          already_triggered=already_triggered, **kwargs)
+    return list(zip(trigger_specs, errors))
+
+
+def _get_shard_thread_pool_size(shard_specs_count,
+                                total_specs_count,
+                                total_thread_pool_size):
+    """Get the thread pool size of a shard, proportional to its share
+    of the trigger specs, so that a dominant shard gets most of the pool
+
+    Args:
+        shard_specs_count (int): Number of trigger specs in the shard
+        total_specs_count (int): Number of trigger specs in all shards
+        total_thread_pool_size (int): Thread pool size to use for all shards
+
+    Returns:
+        int: thread pool size to use for the shard
+    """
+    return max(1, round(total_thread_pool_size * shard_specs_count /
+                        max(total_specs_count, 1)))
+
+
+def _update_state(spec, saasherder, trigger_type):
+    saasherder.update_state(trigger_type, spec)
+
+
 def trigger(spec,
             dry_run,
             saasherder,
             jenkins_map,
             oc_map,
             already_triggered,
-            settings,
+            saas_deploy_job_template,
             trigger_type,
             integration,
             integration_version):
@@ -175,9 +240,10 @@ def trigger(spec,
         saasherder (SaasHerder): a SaasHerder instance
         jenkins_map (dict): Instance names with JenkinsApi instances
         oc_map (OC_Map): a dictionary of OC clients per cluster
-        already_triggered (set): A set of already triggered deployments.
-                                    It will get populated by this function.
-        settings (dict): App-interface settings
+        already_triggered (dict): Already triggered deployments.
+                                  It will get populated by this function.
+        saas_deploy_job_template (string): Name of the saas deploy
+                                           job template
         trigger_type (string): Indicates which method to call to update state
         integration (string): Name of calling integration
         integration_version (string): Version of calling integration
@@ -198,7 +264,7 @@ def trigger(spec,
             saasherder,
             jenkins_map,
             already_triggered,
-            settings,
+            saas_deploy_job_template,
             trigger_type)
 
     elif provider_name == Providers.TEKTON:
@@ -208,7 +274,7 @@ def trigger(spec,
             saasherder,
             oc_map,
             already_triggered,
-            settings,
+            saas_deploy_job_template,
             trigger_type,
             integration,
             integration_version)
@@ -228,7 +294,7 @@ def _trigger_jenkins(spec,
                      saasherder,
                      jenkins_map,
                      already_triggered,
-                     settings,
+                     saas_deploy_job_template,
                      trigger_type):
     # TODO: Convert these into a dataclass.
     saas_file_name = spec['saas_file_name']
@@ -236,8 +302,8 @@ def _trigger_jenkins(spec,
     pipelines_provider = spec['pipelines_provider']
 
     instance_name = pipelines_provider['instance']['name']
-    job_name = get_openshift_saas_deploy_job_name(
-        saas_file_name, env_name, settings)
+    job_name = get_openshift_saas_deploy_job_name_from_template(
+        saas_file_name, env_name, saas_deploy_job_template)
 
     error = False
     to_trigger = _register_trigger(job_name, already_triggered)
@@ -265,7 +331,7 @@ def _trigger_tekton(spec,
                     saasherder,
                     oc_map,
                     already_triggered,
-                    settings,
+                    saas_deploy_job_template,
                     trigger_type,
                     integration,
                     integration_version):
@@ -278,19 +344,20 @@ def _trigger_tekton(spec,
     tkn_namespace_name = tkn_namespace_info['name']
     tkn_cluster_name = tkn_namespace_info['cluster']['name']
     tkn_cluster_console_url = tkn_namespace_info['cluster']['consoleUrl']
-    tkn_trigger_resource, tkn_name = _construct_tekton_trigger_resource(
-        saas_file_name,
-        env_name,
-        tkn_cluster_console_url,
-        tkn_namespace_name,
-        settings,
-        integration,
-        integration_version
-    )
+    tkn_name = _get_tekton_trigger_name(saas_file_name, env_name)
 
     error = False
     to_trigger = _register_trigger(tkn_name, already_triggered)
     if to_trigger:
+        tkn_trigger_resource = _construct_tekton_trigger_resource(
+            saas_file_name,
+            env_name,
+            tkn_cluster_console_url,
+            tkn_namespace_name,
+            saas_deploy_job_template,
+            integration,
+            integration_version
+        )
         try:
             osb.create(dry_run=dry_run,
                        oc_map=oc_map,
@@ -316,7 +383,7 @@ def _construct_tekton_trigger_resource(saas_file_name,
                                        env_name,
                                        tkn_cluster_console_url,
                                        tkn_namespace_name,
-                                       settings,
+                                       saas_deploy_job_template,
                                        integration,
                                        integration_version):
     """Construct a resource (PipelineRun) to trigger a deployment via Tekton.
@@ -327,18 +394,19 @@ def _construct_tekton_trigger_resource(saas_file_name,
         tkn_cluster_console_url (string): Cluster console URL of the cluster
                                           where the pipeline runs
         tkn_namespace_name (string): namespace where the pipeline runs
-        settings (dict): App-interface settings
+        saas_deploy_job_template (string): Name of the saas deploy
+                                           pipeline template
         integration (string): Name of calling integration
         integration_version (string): Version of calling integration
 
     Returns:
         OpenshiftResource: OpenShift resource to be applied
     """
-    long_name = f"{saas_file_name}-{env_name}".lower()
+    long_name = _get_tekton_trigger_name(saas_file_name, env_name)
     # using a timestamp to make the resource name unique.
     # we may want to revisit traceability, but this is compatible
     # with what we currently have in Jenkins.
-    ts = datetime.datetime.utcnow().strftime('%Y%m%d%H%M')  # len 12
+    ts = _get_minute_timestamp(int(time.time() // 60))  # len 12
     # max name length can be 63. leaving 12 for the timestamp - 51
     name = f"{long_name[:UNIQUE_SAAS_FILE_ENV_COMBO_LEN]}-{ts}"
     body = {
@@ -349,30 +417,20 @@ def _construct_tekton_trigger_resource(saas_file_name,
         },
         "spec": {
             "pipelineRef": {
-                "name": settings['saasDeployJobTemplate']
+                "name": saas_deploy_job_template
             },
             "params": [
-                {
-                    "name": "saas_file_name",
-                    "value": saas_file_name
-                },
-                {
-                    "name": "env_name",
-                    "value": env_name
-                },
-                {
-                    "name": "tkn_cluster_console_url",
-                    "value": tkn_cluster_console_url
-                },
-                {
-                    "name": "tkn_namespace_name",
-                    "value": tkn_namespace_name
-                }
+                {"name": k, "value": v} for k, v in [
+                    ("saas_file_name", saas_file_name),
+                    ("env_name", env_name),
+                    ("tkn_cluster_console_url", tkn_cluster_console_url),
+                    ("tkn_namespace_name", tkn_namespace_name),
+                ]
             ]
         }
     }
     return OR(body, integration, integration_version,
-              error_details=name), long_name
+              error_details=name)
 
 
 def _register_trigger(name, already_triggered):
@@ -380,18 +438,99 @@ def _register_trigger(name, already_triggered):
 
     Args:
         name (str): unique trigger name to check and
-        already_triggered (set): A set of already triggered deployments.
-                                 It will get populated by this function.
+        already_triggered (dict): Already triggered deployments.
+                                  It will get populated by this function.
 
     Returns:
         bool: to trigger or not to trigger
     """
-    global _trigger_lock
+    # dict.setdefault is atomic, so when concurrent callers register
+    # the same name only the one whose token got stored will trigger.
+    # names are str objects that cache their hash, so this is a single
+    # hash table probe - a probabilistic prefilter would not be cheaper.
+    token = object()
+    return already_triggered.setdefault(name, token) is token
+
 
-    to_trigger = False
-    with _trigger_lock:
-        if name not in already_triggered:
-            to_trigger = True
-            already_triggered.add(name)
+def _get_trigger_name(spec, saas_deploy_job_template):
+    """Get the unique name of the deployment a trigger spec will trigger
 
-    return to_trigger
+    Args:
+        spec (dict): A trigger spec as created by saasherder
+        saas_deploy_job_template (string): Name of the saas deploy
+                                           job template
+
+    Returns:
+        str: unique trigger name, None for unsupported providers
+    """
+    saas_file_name = spec['saas_file_name']
+    env_name = spec['env_name']
+    provider_name = spec['pipelines_provider']['provider']
+    if provider_name == Providers.JENKINS:
+        return get_openshift_saas_deploy_job_name_from_template(
+            saas_file_name, env_name, saas_deploy_job_template)
+    if provider_name == Providers.TEKTON:
+        return _get_tekton_trigger_name(saas_file_name, env_name)
+    return None
+
+
+def _get_tekton_trigger_name(saas_file_name, env_name):
+    return f"{saas_file_name}-{env_name}".lower()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_minute_timestamp(epoch_minute):
+    # all triggers within the same minute share the same timestamp
+    return time.strftime('%Y%m%d%H%M', time.gmtime(epoch_minute * 60))
+
+
+def _shard_trigger_specs(trigger_specs):
+    """Shard trigger specs by the pipelines provider instance
+    they will be triggered in
+
+    Args:
+        trigger_specs (list): Trigger specs as created by saasherder
+
+    Returns:
+        list: lists of trigger specs, one per shard
+    """
+    shards = {}
+    for spec in trigger_specs:
+        pipelines_provider = spec['pipelines_provider']
+        provider_name = pipelines_provider['provider']
+        if provider_name == Providers.JENKINS:
+            instance = pipelines_provider['instance']['name']
+        elif provider_name == Providers.TEKTON:
+            instance = pipelines_provider['namespace']['cluster']['name']
+        else:
+            instance = None
+        shards.setdefault((provider_name, instance), []).append(spec)
+
+    return list(shards.values())
+
+
+def _split_duplicate_specs(trigger_specs, saas_deploy_job_template):
+    """Split trigger specs to the ones that should be triggered and
+    duplicates of them that would trigger the same deployment
+
+    Args:
+        trigger_specs (list): Trigger specs as created by saasherder
+        saas_deploy_job_template (string): Name of the saas deploy
+                                           job template
+
+    Returns:
+        list: trigger specs to trigger
+        list: duplicate trigger specs
+    """
+    unique_specs = []
+    duplicate_specs = []
+    seen = set()
+    for spec in trigger_specs:
+        name = _get_trigger_name(spec, saas_deploy_job_template)
+        if name is not None and name in seen:
+            duplicate_specs.append(spec)
+            continue
+        seen.add(name)
+        unique_specs.append(spec)
+
+    return unique_specs, duplicate_specs
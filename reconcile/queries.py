@@ -1,6 +1,7 @@
 import logging
 import itertools
 
+from collections import namedtuple
 from textwrap import indent
 
 from jinja2 import Template
@@ -8,9 +9,16 @@ from jinja2 import Template
 import reconcile.utils.gql as gql
 
 
-APP_INTERFACE_SETTINGS_QUERY = """
-{
-  settings: app_interface_settings_v1 {
+def _build_query(selections):
+    """ Returns a query with the given (alias, selection)
+    pairs as its top level fields """
+    fields = '\n'.join(f'  {alias}: {selection.strip()}'
+                       for alias, selection in selections)
+    return '{\n' + fields + '\n}\n'
+
+
+APP_INTERFACE_SETTINGS_SELECTION = """
+  app_interface_settings_v1 {
     vault
     kubeBinary
     mergeRequestGateway
@@ -40,14 +48,20 @@ APP_INTERFACE_SETTINGS_QUERY = """
       }
     }
   }
-}
 """
 
+APP_INTERFACE_SETTINGS_QUERY = _build_query(
+    [('settings', APP_INTERFACE_SETTINGS_SELECTION)])
+
 
 def get_app_interface_settings():
     """ Returns App Interface settings """
     gqlapi = gql.get_api()
     settings = gqlapi.query(APP_INTERFACE_SETTINGS_QUERY)['settings']
+    return _get_single_settings(settings)
+
+
+def _get_single_settings(settings):
     if settings:
         # assuming a single settings file for now
         return settings[0]
@@ -162,9 +176,8 @@ def get_jenkins_instances_previous_urls():
     return all_previous_urls
 
 
-GITLAB_INSTANCES_QUERY = """
-{
-  instances: gitlabinstance_v1 {
+GITLAB_INSTANCES_SELECTION = """
+  gitlabinstance_v1 {
     url
     token {
       path
@@ -177,15 +190,22 @@ GITLAB_INSTANCES_QUERY = """
     }
     sslVerify
   }
-}
 """
 
+GITLAB_INSTANCES_QUERY = _build_query(
+    [('instances', GITLAB_INSTANCES_SELECTION)])
+
 
 def get_gitlab_instance():
     """ Returns a single GitLab instance """
     gqlapi = gql.get_api()
+    instances = gqlapi.query(GITLAB_INSTANCES_QUERY)['instances']
+    return _get_single_gitlab_instance(instances)
+
+
+def _get_single_gitlab_instance(instances):
     # assuming a single GitLab instance for now
-    return gqlapi.query(GITLAB_INSTANCES_QUERY)['instances'][0]
+    return instances[0]
 
 
 GITHUB_INSTANCE_QUERY = """
@@ -230,9 +250,8 @@ def get_github_orgs():
     return gqlapi.query(GITHUB_ORGS_QUERY)['orgs']
 
 
-AWS_ACCOUNTS_QUERY = """
-{
-  accounts: awsaccounts_v1 {
+AWS_ACCOUNTS_SELECTION = """
+  awsaccounts_v1 {
     path
     name
     uid
@@ -259,9 +278,11 @@ AWS_ACCOUNTS_QUERY = """
       region
     }
   }
-}
 """
 
+AWS_ACCOUNTS_QUERY = _build_query(
+    [('accounts', AWS_ACCOUNTS_SELECTION)])
+
 
 def get_aws_accounts():
     """ Returns all AWS accounts """
@@ -1195,9 +1216,8 @@ def get_app_interface_sql_queries():
     return gqlapi.query(APP_INTERFACE_SQL_QUERIES_QUERY)['sql_queries']
 
 
-SAAS_FILES_QUERY_V1 = """
-{
-  saas_files: saas_files_v1 {
+SAAS_FILES_V1_SELECTION = """
+  saas_files_v1 {
     path
     name
     app {
@@ -1316,13 +1336,14 @@ SAAS_FILES_QUERY_V1 = """
       }
     }
   }
-}
 """
 
+SAAS_FILES_QUERY_V1 = _build_query(
+    [('saas_files', SAAS_FILES_V1_SELECTION)])
 
-SAAS_FILES_QUERY_V2 = """
-{
-  saas_files: saas_files_v2 {
+
+SAAS_FILES_V2_SELECTION = """
+  saas_files_v2 {
     path
     name
     app {
@@ -1470,9 +1491,17 @@ SAAS_FILES_QUERY_V2 = """
       }
     }
   }
-}
 """
 
+SAAS_FILES_QUERY_V2 = _build_query(
+    [('saas_files', SAAS_FILES_V2_SELECTION)])
+
+
+def _set_api_version(saas_files, api_version):
+    for sf in saas_files:
+        sf['apiVersion'] = api_version
+    return saas_files
+
 
 def get_saas_files(saas_file_name=None, env_name=None, app_name=None,
                    v1=True,
@@ -1483,14 +1512,10 @@ def get_saas_files(saas_file_name=None, env_name=None, app_name=None,
     saas_files = []
     if v1:
         saas_files_v1 = gqlapi.query(SAAS_FILES_QUERY_V1)['saas_files']
-        for sf in saas_files_v1:
-            sf['apiVersion'] = 'v1'
-        saas_files.extend(saas_files_v1)
+        saas_files.extend(_set_api_version(saas_files_v1, 'v1'))
     if v2:
         saas_files_v2 = gqlapi.query(SAAS_FILES_QUERY_V2)['saas_files']
-        for sf in saas_files_v2:
-            sf['apiVersion'] = 'v2'
-        saas_files.extend(saas_files_v2)
+        saas_files.extend(_set_api_version(saas_files_v2, 'v2'))
 
     if saas_file_name is None and env_name is None and app_name is None:
         return saas_files
@@ -1559,9 +1584,8 @@ def get_saas_files_minimal(v1=True, v2=False):
     return saas_files
 
 
-PIPELINES_PROVIDERS_QUERY = """
-{
-  pipelines_providers: pipelines_providers_v1 {
+PIPELINES_PROVIDERS_SELECTION = """
+  pipelines_providers_v1 {
     name
     provider
     retention {
@@ -1598,9 +1622,11 @@ PIPELINES_PROVIDERS_QUERY = """
       }
     }
   }
-}
 """
 
+PIPELINES_PROVIDERS_QUERY = _build_query(
+    [('pipelines_providers', PIPELINES_PROVIDERS_SELECTION)])
+
 
 def get_pipelines_providers():
     """ Returns PipelinesProvider resources defined in app-interface."""
@@ -1608,6 +1634,45 @@ def get_pipelines_providers():
     return gqlapi.query(PIPELINES_PROVIDERS_QUERY)['pipelines_providers']
 
 
+TriggerSetupBundle = namedtuple('TriggerSetupBundle', [
+    'saas_files', 'gitlab_instance', 'settings', 'aws_accounts',
+    'pipelines_providers'])
+
+
+def get_trigger_setup_bundle(v1=True, v2=False):
+    """ Returns the resources required to set up saas deploy triggers
+    (saas files, GitLab instance, settings, AWS accounts and
+    pipelines providers) using a single GraphQL query. """
+    selections = []
+    if v1:
+        selections.append(('saas_files_v1', SAAS_FILES_V1_SELECTION))
+    if v2:
+        selections.append(('saas_files_v2', SAAS_FILES_V2_SELECTION))
+    selections.extend([
+        ('instances', GITLAB_INSTANCES_SELECTION),
+        ('settings', APP_INTERFACE_SETTINGS_SELECTION),
+        ('accounts', AWS_ACCOUNTS_SELECTION),
+        ('pipelines_providers', PIPELINES_PROVIDERS_SELECTION),
+    ])
+
+    gqlapi = gql.get_api()
+    data = gqlapi.query(_build_query(selections))
+
+    saas_files = []
+    if v1:
+        saas_files.extend(_set_api_version(data['saas_files_v1'], 'v1'))
+    if v2:
+        saas_files.extend(_set_api_version(data['saas_files_v2'], 'v2'))
+
+    return TriggerSetupBundle(
+        saas_files=saas_files,
+        gitlab_instance=_get_single_gitlab_instance(data['instances']),
+        settings=_get_single_settings(data['settings']),
+        aws_accounts=data['accounts'],
+        pipelines_providers=data['pipelines_providers'],
+    )
+
+
 JIRA_BOARDS_QUERY = """
 {
   jira_boards: jira_boards_v1 {
@@ -1,9 +1,11 @@
 import os
 import json
-import copy
 import logging
 
+from collections import Counter
+
 import reconcile.queries as queries
+import reconcile.utils.threaded as threaded
 import reconcile.utils.throughput as throughput
 
 from reconcile.utils.gitlab_api import GitLabApi
@@ -14,47 +16,39 @@ QONTRACT_INTEGRATION = 'saas-file-owners'
 
 def get_baseline_file_path(io_dir):
     dir_path = os.path.join(io_dir, QONTRACT_INTEGRATION)
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path)
+    os.makedirs(dir_path, exist_ok=True)
     return os.path.join(dir_path, 'baseline.json')
 
 
 def get_diffs_file_path(io_dir):
     dir_path = os.path.join(io_dir, QONTRACT_INTEGRATION)
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path)
+    os.makedirs(dir_path, exist_ok=True)
     return os.path.join(dir_path, 'diffs.json')
 
 
-def collect_owners():
+def collect_owners(saas_files=None):
     owners = {}
-    saas_files = queries.get_saas_files(v1=True, v2=True)
+    if saas_files is None:
+        saas_files = queries.get_saas_files(v1=True, v2=True)
     for saas_file in saas_files:
         saas_file_name = saas_file['name']
-        owners[saas_file_name] = set()
-        owner_roles = saas_file.get('roles')
-        if not owner_roles:
-            continue
-        for owner_role in owner_roles:
-            owner_users = owner_role.get('users')
-            if not owner_users:
-                continue
-            for owner_user in owner_users:
+        # dict keys dedupe owners while preserving their order
+        saas_file_owners = {}
+        for owner_role in saas_file.get('roles') or []:
+            for owner_user in owner_role.get('users') or []:
                 owner_username = owner_user['org_username']
                 if owner_user.get('tag_on_merge_requests'):
                     owner_username = f'@{owner_username}'
-                owners[saas_file_name].add(owner_username)
-
-    # make owners suitable for json dump
-    for k in owners:
-        owners[k] = list(owners[k])
+                saas_file_owners[owner_username] = None
+        owners[saas_file_name] = list(saas_file_owners)
 
     return owners
 
 
-def collect_state():
+def collect_state(saas_files=None):
     state = []
-    saas_files = queries.get_saas_files(v1=True, v2=True)
+    if saas_files is None:
+        saas_files = queries.get_saas_files(v1=True, v2=True)
     for saas_file in saas_files:
         saas_file_path = saas_file['path']
         saas_file_name = saas_file['name']
@@ -70,6 +64,10 @@ def collect_state():
             resource_template_name = resource_template['name']
             resource_template_parameters = \
                 json.loads(resource_template.get('parameters') or '{}')
+            # parameters shared by all targets of this resource template
+            base_parameters = {}
+            base_parameters.update(saas_file_parameters)
+            base_parameters.update(resource_template_parameters)
             resource_template_url = resource_template['url']
             for target in resource_template['targets']:
                 namespace_info = target['namespace']
@@ -80,9 +78,7 @@ def collect_state():
                 target_delete = target.get('delete')
                 target_parameters = \
                     json.loads(target.get('parameters') or '{}')
-                parameters = {}
-                parameters.update(saas_file_parameters)
-                parameters.update(resource_template_parameters)
+                parameters = dict(base_parameters)
                 parameters.update(target_parameters)
                 state.append({
                     'saas_file_path': saas_file_path,
@@ -94,28 +90,91 @@ def collect_state():
                     'url': resource_template_url,
                     'ref': target_ref,
                     'parameters': parameters,
-                    'saas_file_definitions':
-                        copy.deepcopy(saas_file_definitions),
+                    # shared by all targets, entries are never mutated
+                    'saas_file_definitions': saas_file_definitions,
                     'delete': target_delete,
                 })
     return state
 
 
+def state_key(state):
+    """ Returns a hashable representation of a state entry """
+    return json.dumps(state, sort_keys=True, separators=(',', ':'))
+
+
 def collect_baseline():
-    owners = collect_owners()
-    state = collect_state()
+    saas_files = queries.get_saas_files(v1=True, v2=True)
+    owners = collect_owners(saas_files)
+    state = collect_state(saas_files)
     return {'owners': owners, 'state': state}
 
 
-def collect_compare_diffs(current_state, desired_state, changed_paths):
-    """ Collect a list of URLs in a git diff format
-    for each change in the merge request """
+def target_key(state):
+    """ Returns the key of the target a state entry deploys to """
+    return (state['saas_file_name'], state['resource_template_name'],
+            state['environment'], state['cluster'], state['namespace'])
+
+
+# state entry fields that are not allowed to change
+# ('ref', 'parameters' and 'disable' are allowed)
+VALID_DIFF_FIELDS = ('saas_file_path', 'saas_file_name',
+                     'resource_template_name', 'cluster', 'namespace',
+                     'environment', 'url', 'delete')
+
+
+def valid_diff_projection(state):
+    """ Returns the fields of a state entry that are not allowed
+    to change, specialized to the shape built by collect_state """
+    saas_file_definitions = state['saas_file_definitions']
+    return (tuple(state.get(k) for k in VALID_DIFF_FIELDS),
+            saas_file_definitions['managed_resource_types'],
+            saas_file_definitions['image_patterns'])
+
+
+def analyze_state(current_state, desired_state, changed_paths):
+    """ Compares current_state and desired_state in a single pass
+    over each of them.
+
+    :param current_state: state entries from the baseline
+    :param desired_state: state entries from the merge request
+    :param changed_paths: paths changed in the merge request
+    :return: a tuple of
+        - the desired state entries not found in the current state
+        - a set of URLs in a git diff format for each change in the
+          merge request
+        - whether the states are different only in 'ref', 'parameters'
+          or 'disable' between entries
+        - whether both states contain exactly the same entries
+    """
+    current_state_keys = Counter()
+    current_refs = {}
+    for c in current_state:
+        current_state_keys[state_key(c)] += 1
+        current_refs.setdefault(target_key(c), []).append(c['ref'])
+
+    diffs = []
     compare_diffs = set()
-    for d in desired_state:
+    is_valid_diff = len(current_state) == len(desired_state)
+    desired_state_keys = Counter()
+    # whether each saas file path has any matching changed path
+    saas_file_path_changed = {}
+    for index, d in enumerate(desired_state):
+        key = state_key(d)
+        desired_state_keys[key] += 1
+        if key not in current_state_keys:
+            diffs.append(d)
+
+        if is_valid_diff:
+            is_valid_diff = valid_diff_projection(current_state[index]) == \
+                valid_diff_projection(d)
+
         # check if this diff was actually changed in the current MR
-        changed_path_matches = [c for c in changed_paths
-                                if c.endswith(d['saas_file_path'])]
-        if not changed_path_matches:
+        saas_file_path = d['saas_file_path']
+        changed = saas_file_path_changed.get(saas_file_path)
+        if changed is None:
+            changed = any(c.endswith(saas_file_path) for c in changed_paths)
+            saas_file_path_changed[saas_file_path] = changed
+        if not changed:
             # this diff was found in the graphql endpoint comparison
             # but is not a part of the changed paths.
             # the only known case for this currently is if a previous MR
@@ -125,29 +184,20 @@ def collect_compare_diffs(current_state, desired_state, changed_paths):
             logging.debug(
                 f'Diff not found in changed paths, skipping: {str(d)}')
             continue
-        for c in current_state:
-            if d['saas_file_name'] != c['saas_file_name']:
-                continue
-            if d['resource_template_name'] != c['resource_template_name']:
-                continue
-            if d['environment'] != c['environment']:
-                continue
-            if d['cluster'] != c['cluster']:
-                continue
-            if d['namespace'] != c['namespace']:
-                continue
-            if d['ref'] == c['ref']:
+        for ref in current_refs.get(target_key(d), []):
+            if d['ref'] == ref:
                 continue
             compare_diffs.add(
-                f"{d['url']}/compare/{c['ref']}...{d['ref']}")
+                f"{d['url']}/compare/{ref}...{d['ref']}")
 
-    return compare_diffs
+    is_same_state = desired_state_keys == current_state_keys
+    return diffs, compare_diffs, is_valid_diff, is_same_state
 
 
 def write_baseline_to_file(io_dir, baseline):
     file_path = get_baseline_file_path(io_dir)
     with open(file_path, 'w') as f:
-        f.write(json.dumps(baseline))
+        json.dump(baseline, f, separators=(',', ':'))
     throughput.change_files_ownership(io_dir)
 
 
@@ -159,21 +209,22 @@ def read_baseline_from_file(io_dir):
 
 
 def write_diffs_to_file(io_dir, diffs, valid_saas_file_changes_only):
-    required_keys = ['saas_file_name', 'environment']
-    diffs = [{k: v for k, v in diff.items()
-              if k in required_keys}
-             for diff in diffs]
+    seen = set()
     unique_diffs = []
     for diff in diffs:
-        if diff not in unique_diffs:
-            unique_diffs.append(diff)
+        key = (diff['saas_file_name'], diff['environment'])
+        if key in seen:
+            continue
+        seen.add(key)
+        unique_diffs.append({'saas_file_name': key[0],
+                             'environment': key[1]})
     file_path = get_diffs_file_path(io_dir)
     body = {
         'valid_saas_file_changes_only': valid_saas_file_changes_only,
         'items': unique_diffs
     }
     with open(file_path, 'w') as f:
-        f.write(json.dumps(body))
+        json.dump(body, f, separators=(',', ':'))
     throughput.change_files_ownership(io_dir)
 
 
@@ -192,37 +243,34 @@ def init_gitlab(gitlab_project_id):
                      settings=settings)
 
 
-def valid_diff(current_state, desired_state):
-    """ checks that current_state and desired_state
-    are different only in 'ref', 'parameters' or 'disable' between entries """
-    current_state_copy = copy.deepcopy(current_state)
-    for c in current_state_copy:
-        c.pop('ref')
-        c.pop('parameters')
-        c['saas_file_definitions'].pop('use_channel_in_image_tag')
-        c.pop('disable', None)
-    desired_state_copy = copy.deepcopy(desired_state)
-    for d in desired_state_copy:
-        d.pop('ref')
-        d.pop('parameters')
-        d['saas_file_definitions'].pop('use_channel_in_image_tag')
-        d.pop('disable', None)
-    return current_state_copy == desired_state_copy
-
-
-def check_if_lgtm(owners, comments):
+LGTM_COMMANDS = frozenset(['/lgtm', '/lgtm cancel', '/hold', '/hold cancel'])
+
+
+def prepare_comments(comments):
+    """ Returns (username, command lines) of each comment in chronological
+    order, keeping only comments with lgtm/hold commands """
+    prepared_comments = []
+    for comment in sorted(comments, key=lambda k: k['created_at']):
+        lines = [line for line in comment['body'].split('\n')
+                 if line in LGTM_COMMANDS]
+        if lines:
+            prepared_comments.append((comment['username'], lines))
+    return prepared_comments
+
+
+def check_if_lgtm(owners, prepared_comments):
     if not owners:
         return False, False
+    owners = {u.replace('@', '') for u in owners}
+    if owners.isdisjoint(c for c, _ in prepared_comments):
+        return False, False
     approved = False
     hold = False
     lgtm_comment = False
-    sorted_comments = sorted(comments, key=lambda k: k['created_at'])
-    owners = [u.replace('@', '') for u in owners]
-    for comment in sorted_comments:
-        commenter = comment['username']
+    for commenter, lines in prepared_comments:
         if commenter not in owners:
             continue
-        for line in comment['body'].split('\n'):
+        for line in lines:
             if line == '/lgtm':
                 lgtm_comment = True
                 approved = True
@@ -240,19 +288,45 @@ def check_if_lgtm(owners, comments):
     return approved, hold
 
 
+def index_changed_paths(changed_paths, saas_file_paths):
+    """ Returns a dict of the changed paths matching each saas file path """
+    return {saas_file_path: [c for c in changed_paths
+                             if c.endswith(saas_file_path)]
+            for saas_file_path in saas_file_paths}
+
+
 def check_saas_files_changes_only(changed_paths, diffs):
-    saas_file_paths = [d['saas_file_path'] for d in diffs]
-    non_saas_file_changed_paths = []
+    saas_file_paths = {d['saas_file_path'] for d in diffs}
+    # changed paths usually match saas file paths exactly, so only
+    # the remaining ones need to go through the suffix check
     for changed_path in changed_paths:
-        found = False
-        for saas_file_path in saas_file_paths:
-            if changed_path.endswith(saas_file_path):
-                found = True
-                break
-        if not found:
-            non_saas_file_changed_paths.append(changed_path)
+        if changed_path in saas_file_paths:
+            continue
+        if not any(changed_path.endswith(saas_file_path)
+                   for saas_file_path in saas_file_paths):
+            return False
+
+    return True
+
 
-    return len(non_saas_file_changed_paths) == 0
+def read_merge_request(read_func, mr_id):
+    return read_func(mr_id)
+
+
+def toggle_label(labels, label, present):
+    """ Returns a copy of labels with label added or removed """
+    if present:
+        return labels if label in labels else labels + [label]
+    return [ln for ln in labels if ln != label]
+
+
+def apply_labels_and_comments(gl, mr_id, labels, desired_labels,
+                              comment_parts):
+    """ Applies the final labels and comment with one call each """
+    if desired_labels != labels:
+        gl.set_labels_on_merge_request(mr_id, desired_labels)
+    if comment_parts:
+        gl.add_comment_to_merge_request(mr_id, '\n\n'.join(comment_parts))
 
 
 def run(dry_run, gitlab_project_id=None, gitlab_merge_request_id=None,
@@ -273,21 +347,28 @@ def run(dry_run, gitlab_project_id=None, gitlab_merge_request_id=None,
     owners = baseline['owners']
     current_state = baseline['state']
     desired_state = collect_state()
-    diffs = [s for s in desired_state if s not in current_state]
-    changed_paths = \
-        gl.get_merge_request_changed_paths(gitlab_merge_request_id)
+    # the merge request reads are independent, fetch them concurrently
+    mr_reads = [gl.get_merge_request_changed_paths,
+                gl.get_merge_request_labels,
+                gl.get_merge_request_comments]
+    changed_paths, labels, comments = threaded.run(
+        read_merge_request, mr_reads, len(mr_reads),
+        mr_id=gitlab_merge_request_id)
 
-    compare_diffs = \
-        collect_compare_diffs(current_state, desired_state, changed_paths)
+    if desired_state == current_state:
+        # nothing changed, skip analyzing the states entry by entry
+        diffs, compare_diffs, is_valid_diff, is_same_state = \
+            [], set(), True, True
+    else:
+        diffs, compare_diffs, is_valid_diff, is_same_state = \
+            analyze_state(current_state, desired_state, changed_paths)
+    comment_parts = []
     if compare_diffs:
-        compare_diffs_comment_body = 'Diffs:\n' + \
-            '\n'.join([f'- {d}' for d in compare_diffs])
-        gl.add_comment_to_merge_request(
-            gitlab_merge_request_id, compare_diffs_comment_body)
+        comment_parts.append(
+            'Diffs:\n' + '\n'.join([f'- {d}' for d in compare_diffs]))
 
     is_saas_file_changes_only = \
         check_saas_files_changes_only(changed_paths, diffs)
-    is_valid_diff = valid_diff(current_state, desired_state)
     valid_saas_file_changes_only = is_saas_file_changes_only and is_valid_diff
     write_diffs_to_file(io_dir, diffs, valid_saas_file_changes_only)
 
@@ -296,31 +377,24 @@ def run(dry_run, gitlab_project_id=None, gitlab_merge_request_id=None,
     output = 'yes' if valid_saas_file_changes_only else 'no'
     print(output)
 
-    labels = gl.get_merge_request_labels(gitlab_merge_request_id)
-    if valid_saas_file_changes_only and saas_label not in labels:
-        gl.add_label_to_merge_request(gitlab_merge_request_id, saas_label)
-    if not valid_saas_file_changes_only and saas_label in labels:
-        gl.remove_label_from_merge_request(
-            gitlab_merge_request_id, saas_label)
+    # labels and comments are accumulated and applied once at the end
+    # to avoid a GitLab round-trip per label operation
+    desired_labels = \
+        toggle_label(labels, saas_label, valid_saas_file_changes_only)
 
-    if desired_state == current_state:
-        gl.remove_label_from_merge_request(
-            gitlab_merge_request_id, approved_label)
-        return
-    if not is_valid_diff:
-        gl.remove_label_from_merge_request(
-            gitlab_merge_request_id, approved_label)
+    if is_same_state or not is_valid_diff:
+        desired_labels = toggle_label(desired_labels, approved_label, False)
+        apply_labels_and_comments(gl, gitlab_merge_request_id,
+                                  labels, desired_labels, comment_parts)
         return
 
-    comments = gl.get_merge_request_comments(gitlab_merge_request_id)
-    comment_lines = {}
-    hold = False
+    comments = prepare_comments(comments)
+    changed_paths_index = index_changed_paths(
+        changed_paths, {d['saas_file_path'] for d in diffs})
+    checked_diffs = []
     for diff in diffs:
         # check if this diff was actually changed in the current MR
-        saas_file_path = diff['saas_file_path']
-        changed_path_matches = [c for c in changed_paths
-                                if c.endswith(saas_file_path)]
-        if not changed_path_matches:
+        if not changed_paths_index[diff['saas_file_path']]:
             # this diff was found in the graphql endpoint comparison
             # but is not a part of the changed paths.
             # the only knows case for this currently is if a previous MR
@@ -330,29 +404,37 @@ def run(dry_run, gitlab_project_id=None, gitlab_merge_request_id=None,
             logging.warning(
                 f'Diff not found in changed paths, skipping: {str(diff)}')
             continue
-        # check for a lgtm by an owner of this app
+        checked_diffs.append(diff)
+
+    # check for a lgtm by an owner of each app. decisions only depend
+    # on the saas file, so they are computed once per saas file before
+    # any label or comment is prepared.
+    lgtm_decisions = {
+        saas_file_name: check_if_lgtm(owners.get(saas_file_name), comments)
+        for saas_file_name in {d['saas_file_name'] for d in checked_diffs}
+    }
+
+    comment_lines = {}
+    not_approved_paths = set(changed_paths)
+    for diff in checked_diffs:
         saas_file_name = diff['saas_file_name']
-        saas_file_owners = owners.get(saas_file_name)
-        valid_lgtm, current_hold = check_if_lgtm(saas_file_owners, comments)
-        hold = hold or current_hold
-        if hold:
-            gl.add_label_to_merge_request(
-                gitlab_merge_request_id, hold_label)
-        else:
-            gl.remove_label_from_merge_request(
-                gitlab_merge_request_id, hold_label)
+        valid_lgtm, _ = lgtm_decisions[saas_file_name]
         if not valid_lgtm:
-            gl.remove_label_from_merge_request(
-                gitlab_merge_request_id, approved_label)
+            saas_file_owners = owners.get(saas_file_name)
             comment_line_body = \
                 f"- changes to saas file '{saas_file_name}' " + \
                 f"require approval (`/lgtm`) from one of: {saas_file_owners}."
             comment_lines[saas_file_name] = comment_line_body
             continue
 
-        # this diff is approved - remove it from changed_paths
-        changed_paths = [c for c in changed_paths
-                         if c not in changed_path_matches]
+        # this diff is approved - remove it from not_approved_paths
+        not_approved_paths.difference_update(
+            changed_paths_index[diff['saas_file_path']])
+
+    # the hold label is only managed if at least one diff was checked
+    if checked_diffs:
+        hold = any(h for _, h in lgtm_decisions.values())
+        desired_labels = toggle_label(desired_labels, hold_label, hold)
 
     comment_body = '\n'.join(comment_lines.values())
     if comment_body:
@@ -360,13 +442,10 @@ def run(dry_run, gitlab_project_id=None, gitlab_merge_request_id=None,
         if not valid_saas_file_changes_only:
             comment_body = comment_body + \
                 '\n\nNote: this merge request can not be self-serviced.'
-        gl.add_comment_to_merge_request(gitlab_merge_request_id, comment_body)
-
-    # if there are still entries in this list - they are not approved
-    if len(changed_paths) != 0:
-        gl.remove_label_from_merge_request(
-            gitlab_merge_request_id, approved_label)
-        return
+        comment_parts.append(comment_body)
 
-    # add approved label to merge request!
-    gl.add_label_to_merge_request(gitlab_merge_request_id, approved_label)
+    # if there are still entries in this set - they are not approved
+    desired_labels = \
+        toggle_label(desired_labels, approved_label, not not_approved_paths)
+    apply_labels_and_comments(gl, gitlab_merge_request_id,
+                              labels, desired_labels, comment_parts)
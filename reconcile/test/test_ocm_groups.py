@@ -0,0 +1,27 @@
+from unittest import TestCase
+
+import reconcile.ocm_groups as integ
+
+
+class TestCalculateDiff(TestCase):
+    def test_no_diff(self):
+        state = {('cluster', 'dedicated-admins', 'user')}
+        self.assertEqual(integ.calculate_diff(state, set(state)), [])
+
+    def test_add_and_delete_users(self):
+        current_state = {
+            ('cluster', 'dedicated-admins', 'keep'),
+            ('cluster', 'dedicated-admins', 'remove'),
+        }
+        desired_state = {
+            ('cluster', 'dedicated-admins', 'keep'),
+            ('cluster', 'dedicated-admins', 'add'),
+        }
+        diffs = integ.calculate_diff(current_state, desired_state)
+        expected = [
+            {'action': 'add_user_to_group', 'cluster': 'cluster',
+             'group': 'dedicated-admins', 'user': 'add'},
+            {'action': 'del_user_from_group', 'cluster': 'cluster',
+             'group': 'dedicated-admins', 'user': 'remove'},
+        ]
+        self.assertEqual(diffs, expected)
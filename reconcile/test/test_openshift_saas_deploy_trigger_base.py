@@ -0,0 +1,208 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+import reconcile.openshift_saas_deploy_trigger_base as trigger_base
+
+
+SAAS_DEPLOY_JOB_TEMPLATE = 'saas-deploy'
+
+
+def jenkins_spec(saas_file_name, env_name, instance_name='ci'):
+    return {
+        'saas_file_name': saas_file_name,
+        'env_name': env_name,
+        'pipelines_provider': {
+            'provider': 'jenkins',
+            'instance': {'name': instance_name},
+        },
+    }
+
+
+def tekton_spec(saas_file_name, env_name, cluster_name='cluster'):
+    return {
+        'saas_file_name': saas_file_name,
+        'env_name': env_name,
+        'pipelines_provider': {
+            'provider': 'tekton',
+            'namespace': {
+                'name': 'pipelines',
+                'cluster': {'name': cluster_name,
+                            'consoleUrl': 'https://console'},
+            },
+        },
+    }
+
+
+class TestGetTriggerName(TestCase):
+    def test_jenkins(self):
+        name = trigger_base._get_trigger_name(
+            jenkins_spec('saas', 'env'), SAAS_DEPLOY_JOB_TEMPLATE)
+        self.assertEqual(name, 'saas-deploy-saas-env')
+
+    def test_tekton(self):
+        name = trigger_base._get_trigger_name(
+            tekton_spec('Saas', 'Env'), SAAS_DEPLOY_JOB_TEMPLATE)
+        self.assertEqual(name, 'saas-env')
+
+
+class TestSplitDuplicateSpecs(TestCase):
+    def test_same_saas_file_and_env(self):
+        specs = [jenkins_spec('saas', 'env'), jenkins_spec('saas', 'env')]
+        unique_specs, duplicate_specs = \
+            trigger_base._split_duplicate_specs(
+                specs, SAAS_DEPLOY_JOB_TEMPLATE)
+        self.assertEqual(unique_specs, [specs[0]])
+        self.assertEqual(duplicate_specs, [specs[1]])
+
+    def test_different_envs(self):
+        specs = [jenkins_spec('saas', 'env1'), jenkins_spec('saas', 'env2')]
+        unique_specs, duplicate_specs = \
+            trigger_base._split_duplicate_specs(
+                specs, SAAS_DEPLOY_JOB_TEMPLATE)
+        self.assertEqual(unique_specs, specs)
+        self.assertEqual(duplicate_specs, [])
+
+    def test_unsupported_provider(self):
+        specs = [
+            {'saas_file_name': 'saas', 'env_name': 'env',
+             'pipelines_provider': {'provider': 'unknown'}}
+            for _ in range(2)
+        ]
+        unique_specs, duplicate_specs = \
+            trigger_base._split_duplicate_specs(
+                specs, SAAS_DEPLOY_JOB_TEMPLATE)
+        # unsupported providers have no trigger name and
+        # are never considered duplicates of each other
+        self.assertEqual(unique_specs, specs)
+        self.assertEqual(duplicate_specs, [])
+
+
+class TestShardTriggerSpecs(TestCase):
+    def test_shards(self):
+        specs = [
+            jenkins_spec('a', 'env', instance_name='ci'),
+            tekton_spec('b', 'env', cluster_name='cluster-1'),
+            jenkins_spec('c', 'env', instance_name='ci-2'),
+            jenkins_spec('d', 'env', instance_name='ci'),
+            tekton_spec('e', 'env', cluster_name='cluster-2'),
+            tekton_spec('f', 'env', cluster_name='cluster-1'),
+        ]
+        shards = trigger_base._shard_trigger_specs(specs)
+        self.assertEqual(shards, [
+            [specs[0], specs[3]],
+            [specs[1], specs[5]],
+            [specs[2]],
+            [specs[4]],
+        ])
+
+    def test_unknown_providers(self):
+        specs = [
+            {'saas_file_name': name, 'env_name': 'env',
+             'pipelines_provider': {'provider': provider}}
+            for name, provider in [('a', 'unknown'), ('b', 'other'),
+                                   ('c', 'unknown')]
+        ]
+        shards = trigger_base._shard_trigger_specs(specs)
+        self.assertEqual(shards, [[specs[0], specs[2]], [specs[1]]])
+
+
+@patch.object(trigger_base, 'trigger')
+class TestTriggerShard(TestCase):
+    def test_results(self, trigger):
+        specs = [jenkins_spec('a', 'env'), jenkins_spec('b', 'env')]
+        trigger.side_effect = \
+            lambda spec, **kwargs: spec['saas_file_name'] == 'b'
+        results = trigger_base._trigger_shard(specs, 2, 2, dry_run=False)
+        self.assertEqual(results, [(specs[0], False), (specs[1], True)])
+
+
+class TestGetShardThreadPoolSize(TestCase):
+    def test_proportional(self):
+        self.assertEqual(
+            trigger_base._get_shard_thread_pool_size(40, 43, 10), 9)
+
+    def test_minimum(self):
+        self.assertEqual(
+            trigger_base._get_shard_thread_pool_size(1, 43, 10), 1)
+
+
+class TestRun(TestCase):
+    def setUp(self):
+        self.saasherder = MagicMock()
+        self.settings = {'saasDeployJobTemplate': SAAS_DEPLOY_JOB_TEMPLATE}
+        self.setup_patcher = patch.object(trigger_base, 'setup')
+        self.setup = self.setup_patcher.start()
+        self.setup.return_value = \
+            (self.saasherder, {}, MagicMock(), self.settings, False)
+        self.trigger_patcher = patch.object(trigger_base, 'trigger')
+        self.trigger = self.trigger_patcher.start()
+
+    def tearDown(self):
+        self.setup_patcher.stop()
+        self.trigger_patcher.stop()
+
+    def run_trigger(self, specs, dry_run=False, thread_pool_size=2):
+        self.saasherder.get_diff.return_value = (specs, False)
+        return trigger_base.run(dry_run, 'moving-commits', 'integration',
+                                'version', thread_pool_size, False, False)
+
+    def test_dominant_shard_gets_most_of_the_pool(self):
+        specs = [jenkins_spec(f'saas-{i}', 'env', instance_name='ci')
+                 for i in range(40)]
+        specs += [jenkins_spec('a', 'env', instance_name='ci-2'),
+                  jenkins_spec('b', 'env', instance_name='ci-3'),
+                  tekton_spec('c', 'env')]
+        self.trigger.return_value = False
+        threaded_run = trigger_base.threaded.run
+        with patch.object(trigger_base.threaded, 'run',
+                          side_effect=threaded_run) as run:
+            self.run_trigger(specs, thread_pool_size=10)
+        shard_pool_sizes = {len(args[1]): args[2]
+                            for args, _ in run.call_args_list
+                            if args[0] is self.trigger}
+        self.assertEqual(shard_pool_sizes, {40: 9, 1: 1})
+
+    def test_errors_from_all_shards(self):
+        specs = [
+            jenkins_spec('a', 'env', instance_name='ci'),
+            jenkins_spec('b', 'env', instance_name='ci-2'),
+            tekton_spec('c', 'env', cluster_name='cluster'),
+        ]
+        for failing in ['a', 'b', 'c']:
+            with self.subTest(failing=failing):
+                self.trigger.side_effect = \
+                    lambda spec, **kwargs: spec['saas_file_name'] == failing
+                self.assertTrue(self.run_trigger(specs))
+        self.trigger.side_effect = None
+        self.trigger.return_value = False
+        self.assertFalse(self.run_trigger(specs))
+
+    def test_diff_error(self):
+        self.trigger.return_value = False
+        self.saasherder.get_diff.return_value = \
+            ([jenkins_spec('a', 'env')], True)
+        self.assertTrue(
+            trigger_base.run(False, 'moving-commits', 'integration',
+                             'version', 2, False, False))
+
+    def test_duplicate_state_updated(self):
+        specs = [jenkins_spec('saas', 'env'), jenkins_spec('saas', 'env')]
+        self.trigger.return_value = False
+        error = self.run_trigger(specs)
+        self.assertFalse(error)
+        self.trigger.assert_called_once()
+        self.saasherder.update_state.assert_called_once_with(
+            'moving-commits', specs[1])
+
+    def test_duplicate_state_not_updated_on_error(self):
+        specs = [jenkins_spec('saas', 'env'), jenkins_spec('saas', 'env')]
+        self.trigger.return_value = True
+        error = self.run_trigger(specs)
+        self.assertTrue(error)
+        self.saasherder.update_state.assert_not_called()
+
+    def test_duplicate_state_not_updated_on_dry_run(self):
+        specs = [jenkins_spec('saas', 'env'), jenkins_spec('saas', 'env')]
+        self.trigger.return_value = False
+        self.run_trigger(specs, dry_run=True)
+        self.saasherder.update_state.assert_not_called()
@@ -0,0 +1,64 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import reconcile.queries as queries
+
+
+@patch.object(queries.gql, 'get_api')
+class TestGetTriggerSetupBundle(TestCase):
+    @staticmethod
+    def response(**kwargs):
+        data = {
+            'instances': [{'url': 'https://gitlab'}],
+            'settings': [{'saasDeployJobTemplate': 'saas-deploy'}],
+            'accounts': [{'name': 'account'}],
+            'pipelines_providers': [{'name': 'provider'}],
+        }
+        data.update(kwargs)
+        return data
+
+    def test_query(self, get_api):
+        get_api.return_value.query.return_value = self.response(
+            saas_files_v1=[], saas_files_v2=[])
+        queries.get_trigger_setup_bundle(v1=True, v2=True)
+        query = get_api.return_value.query.call_args[0][0]
+        top_level_fields = [line.strip() for line in query.splitlines()
+                            if line.startswith('  ') and
+                            not line.startswith('   ') and
+                            line.endswith('{')]
+        self.assertEqual(top_level_fields, [
+            'saas_files_v1: saas_files_v1 {',
+            'saas_files_v2: saas_files_v2 {',
+            'instances: gitlabinstance_v1 {',
+            'settings: app_interface_settings_v1 {',
+            'accounts: awsaccounts_v1 {',
+            'pipelines_providers: pipelines_providers_v1 {',
+        ])
+
+    def test_query_v2_only(self, get_api):
+        get_api.return_value.query.return_value = self.response(
+            saas_files_v2=[])
+        queries.get_trigger_setup_bundle(v1=False, v2=True)
+        query = get_api.return_value.query.call_args[0][0]
+        self.assertNotIn('saas_files_v1', query)
+        self.assertIn('saas_files_v2: saas_files_v2 {', query)
+
+    def test_bundle(self, get_api):
+        get_api.return_value.query.return_value = self.response(
+            saas_files_v1=[{'name': 'a'}], saas_files_v2=[{'name': 'b'}])
+        bundle = queries.get_trigger_setup_bundle(v1=True, v2=True)
+        self.assertEqual(bundle.saas_files, [
+            {'name': 'a', 'apiVersion': 'v1'},
+            {'name': 'b', 'apiVersion': 'v2'},
+        ])
+        self.assertEqual(bundle.gitlab_instance, {'url': 'https://gitlab'})
+        self.assertEqual(bundle.settings,
+                         {'saasDeployJobTemplate': 'saas-deploy'})
+        self.assertEqual(bundle.aws_accounts, [{'name': 'account'}])
+        self.assertEqual(bundle.pipelines_providers, [{'name': 'provider'}])
+
+    def test_bundle_without_settings(self, get_api):
+        get_api.return_value.query.return_value = self.response(
+            saas_files_v1=[], settings=[])
+        bundle = queries.get_trigger_setup_bundle()
+        self.assertIsNone(bundle.settings)
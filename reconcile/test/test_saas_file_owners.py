@@ -0,0 +1,353 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import reconcile.saas_file_owners as saas_file_owners
+
+
+def state_entry(saas_file_name='saas-file', ref='main', **kwargs):
+    entry = {
+        'saas_file_path': f'data/services/{saas_file_name}.yml',
+        'saas_file_name': saas_file_name,
+        'resource_template_name': 'rt',
+        'cluster': 'cluster',
+        'namespace': 'namespace',
+        'environment': 'env',
+        'url': 'https://github.com/app-sre/repo',
+        'ref': ref,
+        'parameters': {},
+        'saas_file_definitions': {
+            'managed_resource_types': ['Deployment'],
+            'image_patterns': ['quay.io/app-sre'],
+            'use_channel_in_image_tag': False,
+        },
+        'delete': None,
+    }
+    entry.update(kwargs)
+    return entry
+
+
+class TestCollectOwners(TestCase):
+    def test_owners(self):
+        saas_files = [
+            {'name': 'saas-file', 'roles': [
+                {'users': [
+                    {'org_username': 'tagged',
+                     'tag_on_merge_requests': True},
+                    {'org_username': 'owner'},
+                ]},
+                {'users': [{'org_username': 'owner'}]},
+                {'users': None},
+            ]},
+            {'name': 'no-roles', 'roles': None},
+        ]
+        self.assertEqual(saas_file_owners.collect_owners(saas_files), {
+            'saas-file': ['@tagged', 'owner'],
+            'no-roles': [],
+        })
+
+
+class TestAnalyzeState(TestCase):
+    @staticmethod
+    def analyze(current_state, desired_state,
+                changed_paths=('data/services/saas-file.yml',)):
+        return saas_file_owners.analyze_state(
+            current_state, desired_state, list(changed_paths))
+
+    def test_ref_changed(self):
+        current_state = [state_entry(ref='old')]
+        desired_state = [state_entry(ref='new')]
+        diffs, compare_diffs, is_valid_diff, is_same_state = \
+            self.analyze(current_state, desired_state)
+        self.assertEqual(diffs, desired_state)
+        self.assertEqual(
+            compare_diffs,
+            {'https://github.com/app-sre/repo/compare/old...new'})
+        self.assertTrue(is_valid_diff)
+        self.assertFalse(is_same_state)
+
+    def test_ref_not_changed(self):
+        current_state = [state_entry(ref='main'),
+                         state_entry(ref='other', namespace='other')]
+        desired_state = [state_entry(ref='main')]
+        diffs, compare_diffs, is_valid_diff, is_same_state = \
+            self.analyze(current_state, desired_state)
+        self.assertEqual(diffs, [])
+        self.assertEqual(compare_diffs, set())
+        self.assertFalse(is_valid_diff)
+        self.assertFalse(is_same_state)
+
+    def test_path_not_changed(self):
+        current_state = [state_entry(ref='old')]
+        desired_state = [state_entry(ref='new')]
+        _, compare_diffs, _, _ = self.analyze(
+            current_state, desired_state,
+            changed_paths=['data/services/other.yml'])
+        self.assertEqual(compare_diffs, set())
+
+    def test_same_state(self):
+        current_state = [state_entry(), state_entry(namespace='other')]
+        desired_state = [state_entry(namespace='other'), state_entry()]
+        diffs, _, _, is_same_state = \
+            self.analyze(current_state, desired_state)
+        self.assertEqual(diffs, [])
+        self.assertTrue(is_same_state)
+
+    def test_ref_and_parameters_changed(self):
+        current_state = [state_entry(ref='old', parameters={'a': 1})]
+        desired_state = [state_entry(ref='new', parameters={'a': 2})]
+        desired_state[0]['saas_file_definitions'] = \
+            dict(desired_state[0]['saas_file_definitions'],
+                 use_channel_in_image_tag=True)
+        _, _, is_valid_diff, _ = self.analyze(current_state, desired_state)
+        self.assertTrue(is_valid_diff)
+        # the input is not modified
+        self.assertEqual(current_state[0]['ref'], 'old')
+
+    def test_namespace_changed(self):
+        current_state = [state_entry(namespace='old')]
+        desired_state = [state_entry(namespace='new')]
+        _, _, is_valid_diff, _ = self.analyze(current_state, desired_state)
+        self.assertFalse(is_valid_diff)
+
+    def test_saas_file_definitions_changed(self):
+        current_state = [state_entry()]
+        desired_state = [state_entry()]
+        desired_state[0]['saas_file_definitions'] = \
+            dict(desired_state[0]['saas_file_definitions'],
+                 managed_resource_types=['Secret'])
+        _, _, is_valid_diff, _ = self.analyze(current_state, desired_state)
+        self.assertFalse(is_valid_diff)
+
+
+class TestStateKey(TestCase):
+    def test_equal_entries(self):
+        a = state_entry(parameters={'a': 1, 'b': 2})
+        b = state_entry(parameters={'b': 2, 'a': 1})
+        self.assertEqual(saas_file_owners.state_key(a),
+                         saas_file_owners.state_key(b))
+
+    def test_different_entries(self):
+        a = state_entry(ref='old')
+        b = state_entry(ref='new')
+        self.assertNotEqual(saas_file_owners.state_key(a),
+                            saas_file_owners.state_key(b))
+
+
+class TestCheckSaasFilesChangesOnly(TestCase):
+    def test_exact_match(self):
+        diffs = [state_entry()]
+        self.assertTrue(saas_file_owners.check_saas_files_changes_only(
+            ['data/services/saas-file.yml'], diffs))
+
+    def test_suffix_match(self):
+        diffs = [state_entry()]
+        self.assertTrue(saas_file_owners.check_saas_files_changes_only(
+            ['/data/services/saas-file.yml'], diffs))
+
+    def test_other_file_changed(self):
+        diffs = [state_entry()]
+        self.assertFalse(saas_file_owners.check_saas_files_changes_only(
+            ['data/services/saas-file.yml', 'README.md'], diffs))
+
+
+class FakeGitLab:
+    def __init__(self, changed_paths, labels=None, comments=None):
+        self.changed_paths = changed_paths
+        self.labels = list(labels or [])
+        self.comments = list(comments or [])
+        self.added_comments = []
+        self.label_updates = 0
+
+    def get_merge_request_changed_paths(self, mr_id):
+        return list(self.changed_paths)
+
+    def get_merge_request_labels(self, mr_id):
+        return list(self.labels)
+
+    def get_merge_request_comments(self, mr_id):
+        return list(self.comments)
+
+    def set_labels_on_merge_request(self, mr_id, labels):
+        self.labels = list(labels)
+        self.label_updates += 1
+
+    def add_comment_to_merge_request(self, mr_id, body):
+        self.added_comments.append(body)
+
+
+def comment(username, body, created_at='2021-01-01T00:00:00Z'):
+    return {'username': username, 'body': body,
+            'created_at': created_at, 'id': 1}
+
+
+class TestCheckIfLgtm(TestCase):
+    def check(self, owners, comments):
+        return saas_file_owners.check_if_lgtm(
+            owners, saas_file_owners.prepare_comments(comments))
+
+    def test_owner_lgtm(self):
+        comments = [comment('owner', 'looks good\n/lgtm')]
+        self.assertEqual(self.check(['@owner'], comments), (True, False))
+
+    def test_no_owner_commented(self):
+        comments = [comment('other', '/lgtm')]
+        self.assertEqual(self.check(['owner'], comments), (False, False))
+
+    def test_comments_are_ordered(self):
+        comments = [
+            comment('owner', '/hold cancel', '2021-01-03T00:00:00Z'),
+            comment('owner', '/hold', '2021-01-02T00:00:00Z'),
+            comment('owner', '/lgtm', '2021-01-01T00:00:00Z'),
+        ]
+        self.assertEqual(self.check(['owner'], comments), (True, False))
+
+
+@patch.object(saas_file_owners, 'write_diffs_to_file')
+@patch.object(saas_file_owners, 'collect_state')
+@patch.object(saas_file_owners, 'read_baseline_from_file')
+@patch.object(saas_file_owners, 'init_gitlab')
+class TestRun(TestCase):
+    def run_integration(self, init_gitlab, read_baseline_from_file,
+                        collect_state, gl, current_state, desired_state,
+                        owners=None):
+        init_gitlab.return_value = gl
+        read_baseline_from_file.return_value = {
+            'owners': owners or {'saas-file': ['owner']},
+            'state': current_state,
+        }
+        collect_state.return_value = desired_state
+        with patch('builtins.print'):
+            saas_file_owners.run(False, gitlab_project_id=1,
+                                 gitlab_merge_request_id=1)
+
+    def test_no_changes(self, init_gitlab, read_baseline_from_file,
+                        collect_state, write_diffs_to_file):
+        gl = FakeGitLab([], labels=['bot/approved'])
+        self.run_integration(init_gitlab, read_baseline_from_file,
+                             collect_state, gl,
+                             [state_entry()], [state_entry()])
+        self.assertNotIn('bot/approved', gl.labels)
+        write_diffs_to_file.assert_called_once()
+        self.assertEqual(write_diffs_to_file.call_args[0][1], [])
+
+    @patch.object(saas_file_owners, 'analyze_state')
+    def test_no_changes_skips_analysis(
+            self, analyze_state, init_gitlab, read_baseline_from_file,
+            collect_state, write_diffs_to_file):
+        gl = FakeGitLab(['data/services/saas-file.yml'],
+                        labels=['bot/approved', 'saas-file-update'])
+        self.run_integration(init_gitlab, read_baseline_from_file,
+                             collect_state, gl,
+                             [state_entry()], [state_entry()])
+        analyze_state.assert_not_called()
+        self.assertEqual(gl.label_updates, 1)
+        self.assertEqual(gl.labels, [])
+        self.assertEqual(gl.added_comments, [])
+
+    def test_approved(self, init_gitlab, read_baseline_from_file,
+                      collect_state, write_diffs_to_file):
+        gl = FakeGitLab(['data/services/saas-file.yml'],
+                        comments=[comment('owner', '/lgtm')])
+        self.run_integration(init_gitlab, read_baseline_from_file,
+                             collect_state, gl,
+                             [state_entry(ref='old')],
+                             [state_entry(ref='new')])
+        self.assertIn('bot/approved', gl.labels)
+        self.assertIn('saas-file-update', gl.labels)
+        self.assertNotIn('bot/hold', gl.labels)
+
+    def test_not_approved(self, init_gitlab, read_baseline_from_file,
+                          collect_state, write_diffs_to_file):
+        gl = FakeGitLab(['data/services/saas-file.yml'],
+                        labels=['bot/approved'],
+                        comments=[comment('other', '/lgtm')])
+        self.run_integration(init_gitlab, read_baseline_from_file,
+                             collect_state, gl,
+                             [state_entry(ref='old')],
+                             [state_entry(ref='new')])
+        self.assertNotIn('bot/approved', gl.labels)
+        self.assertTrue(any('require approval' in c
+                            for c in gl.added_comments))
+
+    def test_hold(self, init_gitlab, read_baseline_from_file,
+                  collect_state, write_diffs_to_file):
+        gl = FakeGitLab(['data/services/saas-file.yml'],
+                        comments=[comment('owner', '/lgtm\n/hold')])
+        self.run_integration(init_gitlab, read_baseline_from_file,
+                             collect_state, gl,
+                             [state_entry(ref='old')],
+                             [state_entry(ref='new')])
+        self.assertIn('bot/hold', gl.labels)
+        self.assertNotIn('bot/approved', gl.labels)
+
+    def test_other_files_changed(self, init_gitlab, read_baseline_from_file,
+                                 collect_state, write_diffs_to_file):
+        gl = FakeGitLab(['data/services/saas-file.yml', 'README.md'],
+                        comments=[comment('owner', '/lgtm')])
+        self.run_integration(init_gitlab, read_baseline_from_file,
+                             collect_state, gl,
+                             [state_entry(ref='old')],
+                             [state_entry(ref='new')])
+        self.assertNotIn('bot/approved', gl.labels)
+        self.assertNotIn('saas-file-update', gl.labels)
+
+    def test_single_label_update_and_comment(
+            self, init_gitlab, read_baseline_from_file,
+            collect_state, write_diffs_to_file):
+        gl = FakeGitLab(['data/services/saas-file.yml',
+                         'data/services/saas-file-2.yml'],
+                        comments=[comment('other', '/hold')])
+        self.run_integration(
+            init_gitlab, read_baseline_from_file, collect_state, gl,
+            [state_entry(ref='old'),
+             state_entry(saas_file_name='saas-file-2', ref='old')],
+            [state_entry(ref='new'),
+             state_entry(saas_file_name='saas-file-2', ref='new')],
+            owners={'saas-file': ['owner'], 'saas-file-2': ['owner']})
+        self.assertEqual(gl.label_updates, 1)
+        self.assertEqual(len(gl.added_comments), 1)
+        self.assertTrue(gl.added_comments[0].startswith('Diffs:'))
+        self.assertIn('require approval', gl.added_comments[0])
+
+    @patch.object(saas_file_owners, 'check_if_lgtm')
+    def test_lgtm_checked_once_per_saas_file(
+            self, check_if_lgtm, init_gitlab, read_baseline_from_file,
+            collect_state, write_diffs_to_file):
+        check_if_lgtm.return_value = (True, True)
+        gl = FakeGitLab(['data/services/saas-file.yml'])
+        self.run_integration(
+            init_gitlab, read_baseline_from_file, collect_state, gl,
+            [state_entry(ref='old'),
+             state_entry(ref='old', environment='other')],
+            [state_entry(ref='new'),
+             state_entry(ref='new', environment='other')])
+        check_if_lgtm.assert_called_once()
+        self.assertIn('bot/hold', gl.labels)
+        self.assertIn('bot/approved', gl.labels)
+
+
+class TestWriteDiffsToFile(TestCase):
+    @patch.object(saas_file_owners.throughput, 'change_files_ownership')
+    def test_unique_diffs(self, change_files_ownership):
+        diffs = [state_entry(ref='a'), state_entry(ref='b'),
+                 state_entry(environment='other')]
+        with tempfile.TemporaryDirectory() as io_dir:
+            saas_file_owners.write_diffs_to_file(io_dir, diffs, True)
+            result = saas_file_owners.read_diffs_from_file(io_dir)
+        self.assertEqual(result, [
+            {'saas_file_name': 'saas-file', 'environment': 'env'},
+            {'saas_file_name': 'saas-file', 'environment': 'other'},
+        ])
+
+    @patch.object(saas_file_owners.throughput, 'change_files_ownership')
+    def test_directory_recreated(self, change_files_ownership):
+        with tempfile.TemporaryDirectory() as io_dir:
+            saas_file_owners.write_diffs_to_file(io_dir, [], True)
+            shutil.rmtree(
+                os.path.join(io_dir, saas_file_owners.QONTRACT_INTEGRATION))
+            saas_file_owners.write_diffs_to_file(io_dir, [], True)
+            result = saas_file_owners.read_diffs_from_file(io_dir)
+        self.assertEqual(result, [])
@@ -1,7 +1,7 @@
 from unittest import TestCase
 from unittest.mock import patch
 
-from reconcile.utils.ocm import OCM
+from reconcile.utils.ocm import OCM, OCMMap
 
 
 class TestVersionBlocked(TestCase):
@@ -53,3 +53,71 @@ class TestVersionRegex(TestCase):
         with self.assertRaises(TypeError):
             OCM('name', 'url', 'tid', 'turl', 'ot',
                 blocked_versions=['['])
+
+
+class TestGetGroups(TestCase):
+    @patch.object(OCM, '_init_access_token')
+    @patch.object(OCM, '_init_request_headers')
+    @patch.object(OCM, '_init_clusters')
+    # pylint: disable=arguments-differ
+    def setUp(self, ocm_init_access_token,
+              ocm_init_request_headers, ocm_init_clusters):
+        self.ocm = OCM('name', 'url', 'tid', 'turl', 'ot')
+        self.ocm.cluster_ids = {'cluster': 'cid'}
+
+    def test_unknown_cluster(self):
+        self.assertEqual(self.ocm.get_groups('other'), {})
+
+    @patch.object(OCM, '_get_json')
+    def test_users_included(self, get_json):
+        get_json.return_value = {'items': [
+            {'id': 'dedicated-admins',
+             'users': {'items': [{'id': 'u1'}, {'id': 'u2'}]}},
+            {'id': 'cluster-admins',
+             'users': {'items': [{'id': 'u3'}]}},
+        ]}
+        result = self.ocm.get_groups('cluster',
+                                     group_ids=['dedicated-admins'])
+        self.assertEqual(result, {'dedicated-admins': ['u1', 'u2']})
+        get_json.assert_called_once()
+
+    @patch.object(OCM, '_get_json')
+    def test_users_not_included(self, get_json):
+        get_json.side_effect = [
+            {'items': [{'id': 'dedicated-admins'}]},
+            {'items': [{'id': 'u1'}]},
+        ]
+        result = self.ocm.get_groups('cluster')
+        self.assertEqual(result, {'dedicated-admins': ['u1']})
+        self.assertEqual(get_json.call_count, 2)
+
+
+class TestOCMMapInit(TestCase):
+    @patch.object(OCMMap, 'init_ocm_client')
+    def test_init_each_ocm_once_concurrently(self, init_ocm_client):
+        clusters = [
+            {'name': 'c1', 'ocm': {'name': 'ocm1'}},
+            {'name': 'c2', 'ocm': {'name': 'ocm1'}},
+            {'name': 'c3', 'ocm': {'name': 'ocm2'}},
+        ]
+        OCMMap(clusters=clusters, thread_pool_size=2)
+        # concurrent calls are made with keyword arguments
+        initiated = [args[0]['name']
+                     for args, kwargs in init_ocm_client.call_args_list
+                     if kwargs]
+        self.assertEqual(sorted(initiated), ['c1', 'c3'])
+        # every cluster is still mapped to its OCM instance
+        self.assertEqual(init_ocm_client.call_count, 5)
+
+    @patch.object(OCMMap, 'init_ocm_client')
+    def test_init_skips_disabled_clusters(self, init_ocm_client):
+        clusters = [
+            {'name': 'c1', 'ocm': {'name': 'ocm1'},
+             'disable': {'integrations': ['integ']}},
+            {'name': 'c2', 'ocm': {'name': 'ocm1'}},
+        ]
+        OCMMap(clusters=clusters, integration='integ', thread_pool_size=2)
+        initiated = [args[0]['name']
+                     for args, kwargs in init_ocm_client.call_args_list
+                     if kwargs]
+        self.assertEqual(initiated, ['c2'])
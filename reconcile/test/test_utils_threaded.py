@@ -1,4 +1,6 @@
 import unittest
+from unittest.mock import patch
+
 import reconcile.utils.threaded as threaded
 
 
@@ -52,3 +54,15 @@ class TestRunStuff(unittest.TestCase):
         rs = threaded.run(raiser, [42], 1, return_exceptions=True)
         self.assertEqual(rs[0].args, ("Oh noes!", ))
         self.assertEqual(len(rs), 1)
+
+    @patch.object(threaded, 'ThreadPool', wraps=threaded.ThreadPool)
+    def test_run_pool_size_not_capped_when_unset(self, thread_pool):
+        rs = threaded.run(identity, [42, 43], None)
+        self.assertEqual(rs, [42, 43])
+        thread_pool.assert_called_once_with(None)
+
+    @patch.object(threaded, 'ThreadPool', wraps=threaded.ThreadPool)
+    def test_run_pool_size_capped_by_items(self, thread_pool):
+        rs = threaded.run(identity, (i for i in [42, 43]), 10)
+        self.assertEqual(rs, [42, 43])
+        thread_pool.assert_called_once_with(2)
@@ -340,6 +340,12 @@ class GitLabApi:
             labels.remove(label)
         self.update_labels(merge_request, 'merge-request', labels)
 
+    def set_labels_on_merge_request(self, mr_id, labels):
+        """ Replaces the labels of a Merge Request in a single update """
+        merge_request = self.project.mergerequests.get(mr_id, lazy=True)
+        merge_request.labels = labels
+        merge_request.save()
+
     def add_comment_to_merge_request(self, mr_id, body):
         merge_request = self.project.mergerequests.get(mr_id)
         merge_request.notes.create({'body': body})
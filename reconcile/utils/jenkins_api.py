@@ -22,10 +22,12 @@ class JenkinsApi:
         self.ssl_verify = ssl_verify
         self.should_restart = False
         self.settings = settings
+        # reuse connections to the instance across requests
+        self.session = requests.Session()
 
     def get_job_names(self):
         url = f"{self.url}/api/json?tree=jobs[name]"
-        res = requests.get(
+        res = self.session.get(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password)
@@ -38,7 +40,7 @@ class JenkinsApi:
     @retry()
     def get_jobs_state(self):
         url = f"{self.url}/api/json?tree=jobs[name,builds[number,result]]"
-        res = requests.get(
+        res = self.session.get(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password)
@@ -55,7 +57,7 @@ class JenkinsApi:
 
     def delete_build(self, job_name, build_id):
         url = f"{self.url}/job/{job_name}/{build_id}/doDelete"
-        res = requests.post(
+        res = self.session.post(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password),
@@ -66,7 +68,7 @@ class JenkinsApi:
         kwargs = self.get_crumb_kwargs()
 
         url = f"{self.url}/job/{job_name}/doDelete"
-        res = requests.post(
+        res = self.session.post(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password),
@@ -77,7 +79,7 @@ class JenkinsApi:
 
     def get_all_roles(self):
         url = "{}/role-strategy/strategy/getAllRoles".format(self.url)
-        res = requests.get(
+        res = self.session.get(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password)
@@ -93,7 +95,7 @@ class JenkinsApi:
             'roleName': role,
             'sid': user
         }
-        res = requests.post(
+        res = self.session.post(
             url,
             verify=self.ssl_verify,
             data=data,
@@ -109,7 +111,7 @@ class JenkinsApi:
             'roleName': role,
             'sid': user
         }
-        res = requests.post(
+        res = self.session.post(
             url,
             verify=self.ssl_verify,
             data=data,
@@ -121,7 +123,7 @@ class JenkinsApi:
     def list_plugins(self):
         url = "{}/pluginManager/api/json?depth=1".format(self.url)
 
-        res = requests.get(
+        res = self.session.get(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password)
@@ -136,7 +138,7 @@ class JenkinsApi:
         url = "{}/pluginManager/installNecessaryPlugins".format(self.url)
         data = \
             '<jenkins><install plugin="{}@current" /></jenkins>'.format(name)
-        res = requests.post(
+        res = self.session.post(
             url,
             verify=self.ssl_verify,
             data=data,
@@ -152,7 +154,7 @@ class JenkinsApi:
             logging.debug('performing safe restart. '
                           f'should_restart={self.should_restart}, '
                           f'force_restart={force_restart}.')
-            res = requests.post(
+            res = self.session.post(
                 url,
                 verify=self.ssl_verify,
                 auth=(self.user, self.password)
@@ -163,7 +165,7 @@ class JenkinsApi:
     def get_builds(self, job_name):
         url = f"{self.url}/job/{job_name}/api/json" + \
             "?tree=allBuilds[timestamp,result,id]"
-        res = requests.get(
+        res = self.session.get(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password)
@@ -177,7 +179,7 @@ class JenkinsApi:
 
     def is_job_running(self, job_name):
         url = f"{self.url}/job/{job_name}/lastBuild/api/json"
-        res = requests.get(
+        res = self.session.get(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password)
@@ -194,7 +196,7 @@ class JenkinsApi:
     def get_crumb_kwargs(self):
         try:
             crumb_url = f"{self.url}/crumbIssuer/api/json"
-            res = requests.get(
+            res = self.session.get(
                 crumb_url,
                 verify=self.ssl_verify,
                 auth=(self.user, self.password)
@@ -213,7 +215,7 @@ class JenkinsApi:
         kwargs = self.get_crumb_kwargs()
 
         url = f"{self.url}/job/{job_name}/build"
-        res = requests.post(
+        res = self.session.post(
             url,
             verify=self.ssl_verify,
             auth=(self.user, self.password),
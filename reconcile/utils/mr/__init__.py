@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from reconcile.utils.mr.base import MergeRequestBase
 
 from reconcile.utils.mr.app_interface_reporter \
@@ -22,8 +24,9 @@ __all__ = [
 ]
 
 
-def init_from_sqs_message(message):
-    # First, let's find the classes that are inheriting from
+@lru_cache(maxsize=1)
+def get_types_map():
+    # Let's find the classes that are inheriting from
     # MergeRequestBase and create a map where the class.name is
     # the key and the class itself is the value.
     # Example:
@@ -32,6 +35,8 @@ def init_from_sqs_message(message):
     #     'create_app_interface_notificator_mr': CreateAppInterfaceNotificator,
     #     ...
     # }
+    # The map does not change during the process lifetime,
+    # so it is only built once.
     types_map = {}
     for item in globals().values():
         if not isinstance(item, type):
@@ -41,6 +46,12 @@ def init_from_sqs_message(message):
         if not hasattr(item, 'name'):
             continue
         types_map[item.name] = item
+    return types_map
+
+
+def init_from_sqs_message(message):
+    # First, let's get the map of the supported types
+    types_map = get_types_map()
 
     # Now let's get the 'pr_type' value from the message
     # and fail early if that type is not on the map.
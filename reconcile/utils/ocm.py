@@ -2,8 +2,11 @@ import logging
 import re
 import requests
 
+from requests.adapters import HTTPAdapter
 from sretoolbox.utils import retry
 
+import reconcile.utils.threaded as threaded
+
 from reconcile.utils.secret_reader import SecretReader
 
 
@@ -35,6 +38,8 @@ class OCM:
     :param init_provision_shards: should initiate provision shards
     :param init_addons: should initiate addons
     :param blocked_versions: versions to block upgrades for
+    :param connection_pool_size: maximum number of connections to keep
+                                 open to the OCM instance
     :type url: string
     :type access_token_client_id: string
     :type access_token_url: string
@@ -42,16 +47,19 @@ class OCM:
     :type init_provision_shards: bool
     :type init_addons: bool
     :type blocked_version: list
+    :type connection_pool_size: int
     """
     def __init__(self, name, url, access_token_client_id, access_token_url,
                  offline_token, init_provision_shards=False,
-                 init_addons=False, blocked_versions=None):
+                 init_addons=False, blocked_versions=None,
+                 connection_pool_size=None):
         """Initiates access token and gets clusters information."""
         self.name = name
         self.url = url
         self.access_token_client_id = access_token_client_id
         self.access_token_url = access_token_url
         self.offline_token = offline_token
+        self._init_session(connection_pool_size)
         self._init_access_token()
         self._init_request_headers()
         self._init_clusters(init_provision_shards=init_provision_shards)
@@ -70,6 +78,16 @@ class OCM:
         r.raise_for_status()
         self.access_token = r.json().get('access_token')
 
+    def _init_session(self, connection_pool_size):
+        # a shared session keeps connections alive across requests,
+        # including requests made concurrently from multiple threads
+        self._session = requests.Session()
+        if connection_pool_size:
+            adapter = HTTPAdapter(pool_connections=connection_pool_size,
+                                  pool_maxsize=connection_pool_size)
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+
     def _init_request_headers(self):
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
@@ -276,6 +294,35 @@ class OCM:
         users = self._get_json(api)['items']
         return {'users': [u['id'] for u in users]}
 
+    def get_groups(self, cluster, group_ids=None):
+        """Returns a dictionary of groups and their users in a cluster.
+        Groups are fetched in a single request, users are only fetched
+        separately if they are not included in the groups response.
+
+        :param cluster: cluster name
+        :param group_ids: group names to return (default: all groups)
+
+        :type cluster: string
+        :type group_ids: list
+        """
+        cluster_id = self.cluster_ids.get(cluster)
+        if not cluster_id:
+            return {}
+        api = f'{CS_API_BASE}/v1/clusters/{cluster_id}/groups'
+        groups = self._get_json(api)['items']
+        results = {}
+        for g in groups:
+            group_id = g['id']
+            if group_ids is not None and group_id not in group_ids:
+                continue
+            users = (g.get('users') or {}).get('items')
+            if users is None:
+                api = f'{CS_API_BASE}/v1/clusters/{cluster_id}/' + \
+                      f'groups/{group_id}/users'
+                users = self._get_json(api)['items']
+            results[group_id] = [u['id'] for u in users]
+        return results
+
     def add_user_to_group(self, cluster, group_id, user):
         """
         Adds a user to a group in a cluster.
@@ -867,12 +914,12 @@ class OCM:
 
     @retry(max_attempts=10)
     def _get_json(self, api):
-        r = requests.get(f"{self.url}{api}", headers=self.headers)
+        r = self._session.get(f"{self.url}{api}", headers=self.headers)
         r.raise_for_status()
         return r.json()
 
     def _post(self, api, data=None, params=None):
-        r = requests.post(
+        r = self._session.post(
             f"{self.url}{api}",
             headers=self.headers,
             json=data,
@@ -888,7 +935,7 @@ class OCM:
         return r.json()
 
     def _patch(self, api, data, params=None):
-        r = requests.patch(
+        r = self._session.patch(
             f"{self.url}{api}",
             headers=self.headers,
             json=data,
@@ -901,7 +948,8 @@ class OCM:
             raise e
 
     def _delete(self, api):
-        r = requests.delete(f"{self.url}{api}", headers=self.headers)
+        r = self._session.delete(f"{self.url}{api}",
+                                 headers=self.headers)
         r.raise_for_status()
 
 
@@ -922,37 +970,55 @@ class OCMMap:
     :param settings: App Interface settings
     :param init_provision_shards: should initiate provision shards
     :param init_addons: should initiate addons
+    :param thread_pool_size: number of threads to initiate OCM clients
+                             with, also used to size the connection
+                             pool of each OCM client
     :type clusters: list
     :type namespaces: list
     :type integration: string
     :type settings: dict
     :type init_provision_shards: bool
     :type init_addons: bool
+    :type thread_pool_size: int
     """
     def __init__(self, clusters=None, namespaces=None,
                  integration='', settings=None,
                  init_provision_shards=False,
-                 init_addons=False):
+                 init_addons=False, thread_pool_size=None):
         """Initiates OCM instances for each OCM referenced in a cluster."""
         self.clusters_map = {}
         self.ocm_map = {}
         self.calling_integration = integration
         self.settings = settings
+        self.thread_pool_size = thread_pool_size
 
         if clusters and namespaces:
             raise KeyError('expected only one of clusters or namespaces.')
         elif clusters:
-            for cluster_info in clusters:
-                self.init_ocm_client(cluster_info, init_provision_shards,
-                                     init_addons)
+            cluster_infos = clusters
         elif namespaces:
-            for namespace_info in namespaces:
-                cluster_info = namespace_info['cluster']
-                self.init_ocm_client(cluster_info, init_provision_shards,
-                                     init_addons)
+            cluster_infos = [namespace_info['cluster']
+                             for namespace_info in namespaces]
         else:
             raise KeyError('expected one of clusters or namespaces.')
 
+        if thread_pool_size:
+            # initiate each referenced OCM instance once, concurrently.
+            # the loop below will then only map clusters to instances.
+            ocm_cluster_infos = {}
+            for cluster_info in cluster_infos:
+                ocm_info = cluster_info.get('ocm')
+                if not ocm_info or self.cluster_disabled(cluster_info):
+                    continue
+                ocm_cluster_infos.setdefault(ocm_info['name'], cluster_info)
+            threaded.run(self.init_ocm_client, ocm_cluster_infos.values(),
+                         thread_pool_size,
+                         init_provision_shards=init_provision_shards,
+                         init_addons=init_addons)
+        for cluster_info in cluster_infos:
+            self.init_ocm_client(cluster_info, init_provision_shards,
+                                 init_addons)
+
     def init_ocm_client(self, cluster_info, init_provision_shards,
                         init_addons):
         """
@@ -992,7 +1058,8 @@ class OCMMap:
                     access_token_client_id, access_token_url, token,
                     init_provision_shards=init_provision_shards,
                     init_addons=init_addons,
-                    blocked_versions=ocm_info.get('blockedVersions'))
+                    blocked_versions=ocm_info.get('blockedVersions'),
+                    connection_pool_size=self.thread_pool_size)
 
     def instances(self):
         """Get list of OCM instance names initiated in the OCM map."""
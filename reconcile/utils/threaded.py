@@ -40,9 +40,14 @@ def run(func, iterable, thread_pool_size, return_exceptions=False, **kwargs):
 
     func_partial = functools.partial(tracer(func), **kwargs)
 
+    # there is no need to start more threads than there are items
+    items = list(iterable)
+    if thread_pool_size:
+        thread_pool_size = max(min(thread_pool_size, len(items)), 1)
+
     pool = ThreadPool(thread_pool_size)
     try:
-        return pool.map(func_partial, iterable)
+        return pool.map(func_partial, items)
     finally:
         pool.close()
         pool.join()